@@ -12,11 +12,15 @@ build_art_site.py
 based on NAS images and sidecar .txt captions + .json metadata.
 """
 
-import shutil
-import re
-import json
+from __future__ import annotations
+
+import functools
+import os
+from html import escape as _html_escape
 from pathlib import Path
-from typing import List, Tuple
+
+# shutil, json/orjson and concurrent.futures are imported inside the functions
+# that use them, to keep start-up cheap for this single-shot script.
 
 # --------------------
 # CONFIGURATION
@@ -26,11 +30,19 @@ from typing import List, Tuple
 NAS_FINISHED_DIR = r"\\192.168.2.132\art-site\finished"
 NAS_SKETCHBOOK_DIR = r"\\192.168.2.132\art-site\sketchbook"
 
+# Normalised string forms, used in the per-image hot loops instead of Path objects
+_NAS_FINISHED_STR = str(Path(NAS_FINISHED_DIR))
+_NAS_SKETCHBOOK_STR = str(Path(NAS_SKETCHBOOK_DIR))
+
 # Local repo folders where images are stored
 REPO_ROOT = Path(__file__).resolve().parent
 LOCAL_FINISHED_DIR = REPO_ROOT / "images" / "finished"
 LOCAL_SKETCHBOOK_DIR = REPO_ROOT / "images" / "sketchbook"
 
+# Local index of NAS caption text, keyed by folder + stem and validated by the
+# .txt (size, mtime), so unchanged captions aren't re-read over SMB every run
+NAS_INDEX_FILE = REPO_ROOT / ".nas_index.pkl"
+
 # HTML files to update
 HOME_HTML_FILE = REPO_ROOT / "index.html"
 HOME_HTML_BACKUP_FILE = REPO_ROOT / "index.backup.html"
@@ -62,85 +74,241 @@ NUM_FEATURED = 3
 # File extensions considered as images
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
 
+# How many .json sidecars to read from the NAS concurrently
+METADATA_READ_WORKERS = 32
+
+# How many images to copy from the NAS concurrently
+COPY_WORKERS = 8
+
 # --------------------
 # HELPER FUNCTIONS
 # --------------------
 
-def list_images_with_captions(folder: Path) -> List[Tuple[Path, str]]:
+def scan_nas_folder(
+    folder: Path,
+) -> tuple[list[Path], dict[str, tuple], dict[str, str], dict[str, tuple[int, float]]]:
+    """
+    Lists a NAS folder with a single os.scandir() pass and classifies every entry:
+      - images, sorted by modification time (newest first)
+      - caption_by_stem: { stem: (path, size, mtime) of the .txt caption sidecar }
+      - json_by_stem:    { stem: path of the .json metadata sidecar }
+        (sidecar stems + extensions are lower-cased, matching how Windows/SMB
+        resolves Foo.TXT for foo.jpg; look them up with stem.lower())
+      - image_stats:     { image file name: (size, mtime) }
+    Entry type + size + mtime come from the cached DirEntry, so everything
+    downstream (including copy_images) works from these in-memory results with
+    no further per-image NAS lookups.
+    """
+    if not folder.exists():
+        return [], {}, {}, {}
+
+    images = []
+    caption_by_stem = {}
+    json_by_stem = {}
+    image_stats = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            stem, ext = os.path.splitext(entry.name)
+            ext = ext.lower()
+            if ext == ".txt":
+                st = entry.stat()
+                caption_by_stem[stem.lower()] = (entry.path, st.st_size, st.st_mtime)
+            elif ext == ".json":
+                json_by_stem[stem.lower()] = entry.path
+            elif ext in IMAGE_EXTS and entry.is_file():
+                st = entry.stat()
+                image_stats[entry.name] = (st.st_size, st.st_mtime)
+                images.append((st.st_mtime, entry.path))
+
+    images.sort(key=lambda t: t[0], reverse=True)
+    return [Path(path) for _, path in images], caption_by_stem, json_by_stem, image_stats
+
+
+def _load_nas_index() -> dict:
+    """Returns { folder: { stem: (size, mtime, caption) } }, or {} if missing/unreadable."""
+    import pickle
+
+    try:
+        with open(NAS_INDEX_FILE, "rb") as f:
+            index = pickle.load(f)
+    except Exception:
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _save_nas_index(index: dict) -> None:
+    import pickle
+
+    tmp_path = NAS_INDEX_FILE.with_name(NAS_INDEX_FILE.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, NAS_INDEX_FILE)
+
+
+def list_images_with_captions(
+    folder: Path,
+    scan: tuple[list[Path], dict[str, tuple], dict[str, str], dict[str, tuple]] | None = None,
+) -> list[tuple[Path, str]]:
     """
     Returns a list of (image_path, caption) sorted by modification time (newest first).
     If a .txt file with the same stem exists, its contents are used as caption.
     Otherwise, caption is empty.
+
+    Caption text is served from NAS_INDEX_FILE when the .txt size + mtime are
+    unchanged since the last run; only new or edited captions are read.
+    Pass the result of scan_nas_folder(folder) as scan to reuse an existing listing.
     """
-    if not folder.exists():
-        return []
+    images, caption_by_stem, _, _ = scan if scan is not None else scan_nas_folder(folder)
 
-    images = []
-    for entry in folder.iterdir():
-        if entry.is_file() and entry.suffix.lower() in IMAGE_EXTS:
-            caption_file = folder / (entry.stem + ".txt")
-            caption = ""
-            if caption_file.exists():
+    index = _load_nas_index()
+    folder_key = str(folder)
+    cached_rows = index.get(folder_key, {})
+    rows = {}
+
+    result = []
+    for image_path in images:
+        caption = ""
+        stem = os.path.splitext(image_path.name)[0].lower()
+        caption_info = caption_by_stem.get(stem)
+        if caption_info is not None:
+            caption_path, size, mtime = caption_info
+            row = cached_rows.get(stem)
+            if row is not None and row[:2] == (size, mtime):
+                caption = row[2]
+                rows[stem] = row
+            else:
                 try:
-                    caption = caption_file.read_text(encoding="utf-8").strip()
+                    with open(caption_path, encoding="utf-8") as f:
+                        caption = f.read().strip()
+                    rows[stem] = (size, mtime, caption)
                 except Exception:
                     caption = ""
-            images.append((entry, caption))
+        result.append((image_path, caption))
 
-    images.sort(key=lambda t: t[0].stat().st_mtime, reverse=True)
-    return images
+    if rows != cached_rows:
+        index[folder_key] = rows
+        try:
+            _save_nas_index(index)
+        except OSError as e:
+            print(f"Warning: could not save NAS index {NAS_INDEX_FILE}: {e}")
+
+    return result
 
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def copy_images(src_items: List[Tuple[Path, str]], dest_folder: Path) -> List[Tuple[str, str]]:
+def _copy_if_changed(
+    src_path: Path,
+    dest_path: str,
+    src_stat: tuple[int, float] | None,
+    dest_stat: tuple[int, float] | None,
+) -> bool:
     """
-    Copies images to dest_folder.
-    Returns list of (file_name, caption) relative to dest_folder.
+    Copies src_path to dest_path unless the existing local copy's
+    (size, mtime) -- dest_stat, None if there is no local copy -- already
+    matches the source's src_stat (copy2 preserves mtime, so unchanged files
+    match). src_stat is stat'ed here only if the caller doesn't have it.
+    Returns True if the file was copied.
+    """
+    if src_stat is None:
+        st = os.stat(src_path)
+        src_stat = (st.st_size, st.st_mtime)
+    if dest_stat is not None and dest_stat == src_stat:
+        return False
+
+    import shutil
+
+    shutil.copy2(src_path, dest_path)
+    return True
+
+
+def copy_images(
+    src_items: list[tuple[Path, str]],
+    dest_folder: Path,
+    src_stats: dict[str, tuple[int, float]] | None = None,
+) -> tuple[list[tuple[str, str]], int]:
+    """
+    Copies images to dest_folder, skipping files that are already up to date.
+    Returns (list of (file_name, caption) relative to dest_folder, number of
+    files actually copied).
     Keeps order the same as src_items (which is already newest-first).
+    Pass src_stats (image_stats from scan_nas_folder) so the NAS side is not
+    stat'ed again per image.
     """
-    ensure_dir(dest_folder)
-    # clear existing images so it stays in sync
-    for f in dest_folder.glob("*"):
-        if f.is_file():
-            f.unlink()
+    if src_stats is None:
+        src_stats = {}
 
-    result = []
-    for src_path, caption in src_items:
-        dest_path = dest_folder / src_path.name
-        shutil.copy2(src_path, dest_path)
-        result.append((dest_path.name, caption))
-    return result
+    from concurrent.futures import ThreadPoolExecutor
+
+    ensure_dir(dest_folder)
+    # local images that are no longer on the NAS get removed so it stays in sync
+    # and the (size, mtime) of the ones we keep is collected in the same pass
+    src_names = {src_path.name for src_path, _ in src_items}
+    stale = []
+    dest_stats = {}
+    with os.scandir(dest_folder) as it:
+        for entry in it:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if entry.name in src_names:
+                st = entry.stat(follow_symlinks=False)
+                dest_stats[entry.name] = (st.st_size, st.st_mtime)
+            else:
+                stale.append(entry.path)
+
+    # One pool for removals + copies, so several SMB reads are in flight at once
+    # and the deletes overlap with them instead of running first
+    dest_str = str(dest_folder)
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        removals = [executor.submit(os.unlink, path) for path in stale]
+        copied = sum(executor.map(
+            lambda item: _copy_if_changed(
+                item[0],
+                os.path.join(dest_str, item[0].name),
+                src_stats.get(item[0].name),
+                dest_stats.get(item[0].name),
+            ),
+            src_items,
+        ))
+        for removal in removals:
+            removal.result()
+
+    return [(src_path.name, caption) for src_path, caption in src_items], copied
+
+
+def _atomic_write(path: Path, data: str) -> None:
+    """
+    Writes data (UTF-8) to a temp file next to path, then renames it over path,
+    so a crash never leaves a half-written HTML file behind.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data.encode("utf-8"))
+    os.replace(tmp_path, path)
 
 
 def escape_html(text: str) -> str:
-    """Minimal HTML escaping for captions/titles."""
-    return (
-        text.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-    )
+    """Minimal HTML escaping for captions/titles (single pass, safe inside attributes)."""
+    return _html_escape(text, quote=True)
 
 
-def _derive_title_and_body(file_name: str, caption: str) -> Tuple[str, str]:
+def _derive_title_and_body(file_name: str, caption: str) -> tuple[str, str]:
     """
     Helper to derive a nice title + body from filename + caption.
     - Title = first part of caption (split on '—') or filename-based
     - Body  = full caption, or fallback sentence
     """
     if caption:
-        raw_title = caption.split("—")[0].strip()
+        raw_title = caption.partition("—")[0].strip()
         if raw_title:
             title = raw_title
         else:
-            stem = Path(file_name).stem.replace("_", " ")
+            stem = os.path.splitext(file_name)[0].replace("_", " ")
             title = stem.title()
         body = caption
     else:
-        stem = Path(file_name).stem.replace("_", " ")
+        stem = os.path.splitext(file_name)[0].replace("_", " ")
         title = stem.title()
         body = "New artwork from Myles."
 
@@ -149,40 +317,25 @@ def _derive_title_and_body(file_name: str, caption: str) -> Tuple[str, str]:
 
 # ---------- METADATA HELPERS (JSON from NAS) ----------
 
-def _get_nas_folder_for_kind(kind: str) -> Path:
+def _get_nas_folder_for_kind(kind: str) -> str:
     if kind == "sketchbook":
-        return Path(NAS_SKETCHBOOK_DIR)
-    return Path(NAS_FINISHED_DIR)
-
-
-def get_metadata_for_image(file_name: str, kind: str) -> dict:
-    """
-    Load JSON metadata for an image from the NAS if available.
-
-    Returns a dict with at least:
-      { "slug": str, "tags": List[str], "characters": List[str], "kind": str }
+        return _NAS_SKETCHBOOK_STR
+    return _NAS_FINISHED_STR
 
-    Falls back gracefully if JSON is missing or malformed.
-    """
-    nas_folder = _get_nas_folder_for_kind(kind)
-    json_path = nas_folder / (Path(file_name).stem + ".json")
 
-    meta = {
+def _default_metadata(kind: str) -> dict:
+    return {
         "slug": "",
         "tags": [],
         "characters": [],
         "kind": kind,
     }
 
-    if not json_path.exists():
-        return meta
 
-    try:
-        data = json.loads(json_path.read_text(encoding="utf-8"))
-    except Exception:
-        return meta
+def _normalise_metadata(data: dict, kind: str) -> dict:
+    """Normalise a raw JSON sidecar into the metadata shape used by the builders."""
+    meta = _default_metadata(kind)
 
-    # Normalise fields
     slug = str(data.get("slug") or "").strip()
     tags = data.get("tags") or []
     characters = data.get("characters") or []
@@ -200,6 +353,86 @@ def get_metadata_for_image(file_name: str, kind: str) -> dict:
     return meta
 
 
+def _safe_json_load(json_path: str, json_loads):
+    """Returns the parsed JSON from json_path, or None if it can't be read/parsed."""
+    try:
+        with open(json_path, "rb") as f:
+            return json_loads(f.read())
+    except Exception:
+        return None
+
+
+# Metadata per kind, keyed by image stem (filled once per run by load_all_metadata)
+_META_CACHE: dict = {}
+
+
+def load_all_metadata(
+    nas_folder: str | Path,
+    kind: str,
+    json_by_stem: dict[str, str] | None = None,
+) -> dict:
+    """
+    Lists the NAS folder once and loads every .json sidecar up front.
+    Pass json_by_stem (from scan_nas_folder) to skip the listing entirely.
+
+    Returns { stem: meta } and caches it per kind, so later lookups via
+    get_metadata_for_image() never touch the NAS again.
+    Malformed JSON files are skipped (those images get default metadata).
+    """
+    if kind in _META_CACHE:
+        return _META_CACHE[kind]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # orjson parses bytes directly and is much faster; it's optional.
+    try:
+        from orjson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+
+    if json_by_stem is None:
+        json_by_stem = {}
+        if os.path.isdir(nas_folder):
+            with os.scandir(nas_folder) as it:
+                json_by_stem = {
+                    e.name[:-5].lower(): e.path for e in it if e.name.lower().endswith(".json")
+                }
+
+    metadata = {}
+    if json_by_stem:
+        # Sidecars are tiny, so each read is one NAS round trip; overlap them.
+        with ThreadPoolExecutor(max_workers=METADATA_READ_WORKERS) as executor:
+            loaded = list(executor.map(
+                lambda item: (item[0], _safe_json_load(item[1], json_loads)),
+                json_by_stem.items(),
+            ))
+
+        for stem, data in loaded:
+            if isinstance(data, dict):
+                metadata[stem] = _normalise_metadata(data, kind)
+
+    _META_CACHE[kind] = metadata
+    return metadata
+
+
+def get_metadata_for_image(file_name: str, kind: str) -> dict:
+    """
+    Look up JSON metadata for an image (loaded from the NAS by load_all_metadata).
+
+    Returns a dict with at least:
+      { "slug": str, "tags": list[str], "characters": list[str], "kind": str }
+
+    Falls back gracefully if JSON is missing or malformed.
+    """
+    metadata = _META_CACHE.get(kind)
+    if metadata is None:
+        metadata = load_all_metadata(_get_nas_folder_for_kind(kind), kind)
+    meta = metadata.get(os.path.splitext(file_name)[0].lower())
+    if meta is None:
+        return _default_metadata(kind)
+    return meta
+
+
 def build_data_attributes(meta: dict) -> str:
     """
     Build a string of data-* attributes from metadata, e.g.
@@ -227,145 +460,228 @@ def build_data_attributes(meta: dict) -> str:
     return "".join(parts)
 
 
+@functools.lru_cache(maxsize=None)
+def _data_attrs_for(file_name: str, kind: str) -> str:
+    """
+    data-* attribute string for an image, built once per (file_name, kind)
+    even when the image appears in several sections (featured + gallery).
+    """
+    return build_data_attributes(get_metadata_for_image(file_name, kind))
+
+
 # ---------- HTML BUILDERS ----------
 
+# Invariant card markup, shared by the featured + gallery grids.
+# Per card only img_src, title, body and data_attrs vary.
+_FEATURED_CARD_OPEN = '  <article class="card"'
+_GALLERY_CARD_OPEN = '  <article class="card gallery-card"'
+_CARD_IMG_OPEN = '>\n    <div class="card-image">\n      <img src="'
+_CARD_IMG_ALT = '" alt="'
+_CARD_TITLE_OPEN = '" />\n    </div>\n    <div class="card-body">\n      <h3>'
+_CARD_BODY_OPEN = '</h3>\n      <p>'
+_CARD_CLOSE = '</p>\n    </div>\n  </article>'
+_CARD_SEPARATOR = "\n\n"
+
+_SKETCH_OPEN = '  <div class="sketch"'
+_SKETCH_IMG_OPEN = '>\n    <img src="'
+_SKETCH_CLOSE = '" />\n  </div>\n'
+_SKETCH_PLACEHOLDER = '  <div class="sketch placeholder"><span>Future sketch</span></div>\n'
+
+_HERO_IMG_OPEN = '<div class="hero-image">\n  <img src="images/finished/'
+_HERO_CLASS = '" class="hero-art"'
+_HERO_CLOSE = ' />\n</div>'
+
+
+def _append_card(parts: list[str], article_open: str, card: dict) -> None:
+    """Appends one <article> card's fragments to parts (no intermediate strings)."""
+    title = card["title"]
+    parts.extend((
+        article_open, card["data_attrs"],
+        _CARD_IMG_OPEN, card["img_src"], _CARD_IMG_ALT, title,
+        _CARD_TITLE_OPEN, title,
+        _CARD_BODY_OPEN, card["body"],
+        _CARD_CLOSE,
+    ))
+
+
 def build_hero_html(file_name: str, caption: str) -> str:
     """
     Builds the hero-image block for index.html.
     Uses caption as alt text if available; otherwise falls back to filename-based title.
     Attaches JSON metadata as data-* attributes on the <img>.
     """
-    img_src = f"images/finished/{file_name}"
-
     if caption:
         alt = escape_html(caption)
     else:
-        stem = Path(file_name).stem.replace("_", " ")
+        stem = os.path.splitext(file_name)[0].replace("_", " ")
         alt = stem.title()
 
-    meta = get_metadata_for_image(file_name, kind="finished")
-    data_attrs = build_data_attributes(meta)
-
-    return (
-        '<div class="hero-image">\n'
-        f'  <img src="{img_src}" alt="{alt}" class="hero-art"{data_attrs} />\n'
-        '</div>'
-    )
+    return "".join((
+        _HERO_IMG_OPEN, file_name,
+        _CARD_IMG_ALT, alt,
+        _HERO_CLASS, _data_attrs_for(file_name, "finished"),
+        _HERO_CLOSE,
+    ))
 
 
-def build_featured_html(items: List[Tuple[str, str]]) -> str:
+def precompute_cards(items: list[tuple[str, str]], kind: str) -> list[dict]:
     """
-    Builds the Featured Pieces card grid for the home page.
-    Uses caption as the title where possible.
-    Attaches JSON metadata as data-* attributes on each <article>.
+    Derives everything the HTML builders need for each (file_name, caption) once:
+      { "name", "caption", "img_src", "title", "body", "data_attrs" }
+    kind is "finished" or "sketchbook" (also the images/ subfolder).
+    The same records are reused by every section that shows the image.
     """
-    if not items:
-        return '<div class="card-grid"></div>'
-
     cards = []
     for file_name, caption in items:
-        img_src = f"images/finished/{file_name}"
         title, body = _derive_title_and_body(file_name, caption)
+        cards.append({
+            "name": file_name,
+            "caption": caption,
+            "img_src": f"images/{kind}/{file_name}",
+            "title": title,
+            "body": body,
+            "data_attrs": _data_attrs_for(file_name, kind),
+        })
+    return cards
+
+
+def build_featured_html(cards: list[dict]) -> str:
+    """
+    Builds the Featured Pieces card grid for the home page from precomputed cards.
+    Uses caption as the title where possible.
+    Attaches JSON metadata as data-* attributes on each <article>.
+    """
+    if not cards:
+        return '<div class="card-grid"></div>'
 
-        meta = get_metadata_for_image(file_name, kind="finished")
-        data_attrs = build_data_attributes(meta)
-
-        card = (
-            f'  <article class="card"{data_attrs}>\n'
-            '    <div class="card-image">\n'
-            f'      <img src="{img_src}" alt="{title}" />\n'
-            '    </div>\n'
-            '    <div class="card-body">\n'
-            f'      <h3>{title}</h3>\n'
-            f'      <p>{body}</p>\n'
-            '    </div>\n'
-            '  </article>'
-        )
-        cards.append(card)
+    parts = ['<div class="card-grid">\n']
+    for i, card in enumerate(cards):
+        if i:
+            parts.append(_CARD_SEPARATOR)
+        _append_card(parts, _FEATURED_CARD_OPEN, card)
+    parts.append("\n</div>")
 
-    return "<div class=\"card-grid\">\n" + "\n\n".join(cards) + "\n</div>"
+    return "".join(parts)
 
 
-def build_gallery_html(items: List[Tuple[str, str]], subfolder: str) -> str:
+def build_gallery_html(cards: list[dict]) -> str:
     """
-    Builds a full gallery grid (.card layout) for either finished or sketchbook.
-    subfolder is "finished" or "sketchbook" to build the correct image src paths.
+    Builds a full gallery grid (.card layout) for either finished or sketchbook
+    from precomputed cards (which already carry the correct image src paths).
     Attaches JSON metadata as data-* attributes on each <article>.
     """
-    if not items:
+    if not cards:
         return '<div class="card-grid gallery-grid"></div>'
 
-    kind = subfolder  # "finished" or "sketchbook"
-    cards = []
-    for file_name, caption in items:
-        img_src = f"images/{subfolder}/{file_name}"
-        title, body = _derive_title_and_body(file_name, caption)
-
-        meta = get_metadata_for_image(file_name, kind=kind)
-        data_attrs = build_data_attributes(meta)
-
-        card = (
-            f'  <article class="card gallery-card"{data_attrs}>\n'
-            '    <div class="card-image">\n'
-            f'      <img src="{img_src}" alt="{title}" />\n'
-            '    </div>\n'
-            '    <div class="card-body">\n'
-            f'      <h3>{title}</h3>\n'
-            f'      <p>{body}</p>\n'
-            '    </div>\n'
-            '  </article>'
-        )
-        cards.append(card)
+    parts = ['<div class="card-grid gallery-grid">\n']
+    for i, card in enumerate(cards):
+        if i:
+            parts.append(_CARD_SEPARATOR)
+        _append_card(parts, _GALLERY_CARD_OPEN, card)
+    parts.append("\n</div>")
 
-    return "<div class=\"card-grid gallery-grid\">\n" + "\n\n".join(cards) + "\n</div>"
+    return "".join(parts)
 
 
-def build_home_sketches_html(items: List[Tuple[str, str]]) -> str:
+def build_home_sketches_html(cards: list[dict]) -> str:
     """
     Builds the small 2x2 sketch preview grid for the home page.
     - Uses up to 4 latest sketches with images.
     - Fills remaining slots (to 4) with 'Future sketch' placeholders.
     Attaches JSON metadata as data-* attributes on each sketch <div>.
     """
-    cells = []
     max_sketches = 4
-    used = items[:max_sketches]
+    used = cards[:max_sketches]
 
-    for file_name, caption in used:
-        img_src = f"images/sketchbook/{file_name}"
-        title, _ = _derive_title_and_body(file_name, caption)
+    parts = ['<div class="sketch-preview-grid">\n']
+    for card in used:
+        parts.extend((
+            _SKETCH_OPEN, card["data_attrs"],
+            _SKETCH_IMG_OPEN, card["img_src"], _CARD_IMG_ALT, card["title"],
+            _SKETCH_CLOSE,
+        ))
 
-        meta = get_metadata_for_image(file_name, kind="sketchbook")
-        data_attrs = build_data_attributes(meta)
+    # Fill remaining cells up to 4 with placeholders (only if you have < 4 sketches)
+    for _ in range(max_sketches - len(used)):
+        parts.append(_SKETCH_PLACEHOLDER)
 
-        cell = (
-            f'  <div class="sketch"{data_attrs}>\n'
-            f'    <img src="{img_src}" alt="{title}" />\n'
-            '  </div>'
-        )
-        cells.append(cell)
+    parts.append("</div>")
+
+    return "".join(parts)
 
-    # Fill remaining cells up to 4 with placeholders (only if you have < 4 sketches)
-    while len(cells) < 4:
-        cells.append('  <div class="sketch placeholder"><span>Future sketch</span></div>')
 
-    return "<div class=\"sketch-preview-grid\">\n" + "\n".join(cells) + "\n</div>"
+def _find_section(html: str, start_marker: str, end_marker: str) -> tuple[int, int]:
+    """
+    Returns (start, end) of the first start_marker .. end_marker block in html
+    (end is just past end_marker). Plain str.find -- the markers are literals.
+    """
+    start = html.find(start_marker)
+    end = html.find(end_marker, start + len(start_marker)) if start != -1 else -1
+    if end == -1:
+        raise ValueError(f"Markers not found: {start_marker} .. {end_marker}")
+    return start, end + len(end_marker)
 
 
-def replace_section(html: str, start_marker: str, end_marker: str, new_content: str) -> str:
+def splice_sections(
+    src_path: Path,
+    dst_path: Path,
+    markers: dict,
+    new_contents: dict,
+    backup_path: Path | None = None,
+) -> bool:
     """
-    Replaces the content between start_marker and end_marker (inclusive) with:
-    start_marker + newline + new_content + newline + end_marker
+    Replaces the content between each marker pair (inclusive) in src_path with:
+      start_marker + newline + new_content + newline + end_marker
+    and writes the result to dst_path (which may be src_path).
+
+    markers maps key -> (start_marker, end_marker); new_contents maps key -> content.
+    The source is read once, every section is found with str.find, and the
+    unchanged segments + fresh content are streamed to a temp file that is then
+    renamed over dst_path -- the full new page is never built as one string.
+
+    If every section already holds its new content, nothing is written and
+    False is returned. Otherwise the original is first saved to backup_path
+    (if given) and True is returned.
     """
-    pattern = re.compile(
-        re.escape(start_marker) + r".*?" + re.escape(end_marker),
-        re.DOTALL
+    html = src_path.read_text(encoding="utf-8")
+
+    spans = sorted(
+        (*_find_section(html, start_marker, end_marker), key)
+        for key, (start_marker, end_marker) in markers.items()
     )
-    replacement = f"{start_marker}\n{new_content}\n{end_marker}"
-    new_html, count = pattern.subn(replacement, html, count=1)
-    if count == 0:
-        raise ValueError(f"Markers not found: {start_marker} .. {end_marker}")
-    return new_html
+
+    unchanged = True
+    pos = 0
+    for start, end, key in spans:
+        if start < pos:
+            raise ValueError(f"Overlapping sections in HTML: {key}")
+        start_marker, end_marker = markers[key]
+        inner = html[start + len(start_marker):end - len(end_marker)]
+        if inner != f"\n{new_contents[key]}\n":
+            unchanged = False
+        pos = end
+
+    if unchanged and dst_path == src_path:
+        return False
+
+    if backup_path is not None:
+        _atomic_write(backup_path, html)
+
+    tmp_path = dst_path.with_name(dst_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        pos = 0
+        for start, end, key in spans:
+            start_marker, end_marker = markers[key]
+            f.write(html[pos:start])
+            f.write(start_marker)
+            f.write("\n")
+            f.write(new_contents[key])
+            f.write("\n")
+            f.write(end_marker)
+            pos = end
+        f.write(html[pos:])
+    os.replace(tmp_path, dst_path)
+    return True
 
 # --------------------
 # MAIN
@@ -377,35 +693,51 @@ def main():
     if not nas_finished.exists():
         raise SystemExit(f"NAS finished folder does not exist: {nas_finished}")
 
-    finished_items = list_images_with_captions(nas_finished)
+    # One NAS listing drives images, captions and metadata for the folder
+    finished_scan = scan_nas_folder(nas_finished)
+    finished_items = list_images_with_captions(nas_finished, finished_scan)
+    load_all_metadata(nas_finished, "finished", finished_scan[2])
     if not finished_items:
         print("Warning: no images found in finished folder.")
 
-    copied_finished = copy_images(finished_items, LOCAL_FINISHED_DIR)
-    print(f"Copied {len(copied_finished)} finished images to {LOCAL_FINISHED_DIR}")
+    copied_finished, num_copied = copy_images(finished_items, LOCAL_FINISHED_DIR, finished_scan[3])
+    print(
+        f"Copied {num_copied} finished images to {LOCAL_FINISHED_DIR} "
+        f"({len(copied_finished) - num_copied} already up to date)"
+    )
+
+    finished_cards = precompute_cards(copied_finished, "finished")
 
     # hero + featured (newest-first behaviour)
     hero = copied_finished[0] if copied_finished else None
-    featured = copied_finished[1:1 + NUM_FEATURED] if len(copied_finished) > 1 else []
+    featured = finished_cards[1:1 + NUM_FEATURED] if len(finished_cards) > 1 else []
 
     hero_html = build_hero_html(hero[0], hero[1]) if hero else '<div class="hero-image"></div>'
     featured_html = build_featured_html(featured)
-    gallery_finished_html = build_gallery_html(copied_finished, "finished")
+    gallery_finished_html = build_gallery_html(finished_cards)
 
     # ----- SKETCHBOOK -----
     nas_sketchbook = Path(NAS_SKETCHBOOK_DIR)
-    sketchbook_items: List[Tuple[Path, str]] = []
-    copied_sketchbook: List[Tuple[str, str]] = []
+    sketchbook_items: list[tuple[Path, str]] = []
+    copied_sketchbook: list[tuple[str, str]] = []
 
     if nas_sketchbook.exists():
-        sketchbook_items = list_images_with_captions(nas_sketchbook)
-        copied_sketchbook = copy_images(sketchbook_items, LOCAL_SKETCHBOOK_DIR)
-        print(f"Copied {len(copied_sketchbook)} sketchbook images to {LOCAL_SKETCHBOOK_DIR}")
+        sketchbook_scan = scan_nas_folder(nas_sketchbook)
+        sketchbook_items = list_images_with_captions(nas_sketchbook, sketchbook_scan)
+        load_all_metadata(nas_sketchbook, "sketchbook", sketchbook_scan[2])
+        copied_sketchbook, num_copied = copy_images(
+            sketchbook_items, LOCAL_SKETCHBOOK_DIR, sketchbook_scan[3]
+        )
+        print(
+            f"Copied {num_copied} sketchbook images to {LOCAL_SKETCHBOOK_DIR} "
+            f"({len(copied_sketchbook) - num_copied} already up to date)"
+        )
     else:
         print(f"Sketchbook folder does not exist on NAS: {nas_sketchbook}")
 
-    gallery_sketchbook_html = build_gallery_html(copied_sketchbook, "sketchbook")
-    home_sketches_html = build_home_sketches_html(copied_sketchbook)
+    sketchbook_cards = precompute_cards(copied_sketchbook, "sketchbook")
+    gallery_sketchbook_html = build_gallery_html(sketchbook_cards)
+    home_sketches_html = build_home_sketches_html(sketchbook_cards)
 
     # --------------------
     # Update HOME page
@@ -413,32 +745,42 @@ def main():
     if not HOME_HTML_FILE.exists():
         raise SystemExit(f"Home HTML file not found: {HOME_HTML_FILE}")
 
-    original_home = HOME_HTML_FILE.read_text(encoding="utf-8")
-    HOME_HTML_BACKUP_FILE.write_text(original_home, encoding="utf-8")
-    print(f"Home backup created: {HOME_HTML_BACKUP_FILE}")
+    home_changed = splice_sections(
+        HOME_HTML_FILE,
+        HOME_HTML_FILE,
+        MARKERS_HOME,
+        {
+            "hero": hero_html,
+            "featured": featured_html,
+            "sketch_preview": home_sketches_html,
+        },
+        backup_path=HOME_HTML_BACKUP_FILE,
+    )
 
-    new_home = original_home
-    new_home = replace_section(new_home, *MARKERS_HOME["hero"], hero_html)
-    new_home = replace_section(new_home, *MARKERS_HOME["featured"], featured_html)
-    new_home = replace_section(new_home, *MARKERS_HOME["sketch_preview"], home_sketches_html)
-    HOME_HTML_FILE.write_text(new_home, encoding="utf-8")
-    print(f"Updated home HTML written to: {HOME_HTML_FILE}")
+    # Nothing changed on the NAS -> both the backup and the write were skipped
+    if home_changed:
+        print(f"Home backup created: {HOME_HTML_BACKUP_FILE}")
+        print(f"Updated home HTML written to: {HOME_HTML_FILE}")
+    else:
+        print(f"Home HTML unchanged, skipping write: {HOME_HTML_FILE}")
 
     # --------------------
     # Update GALLERY page
     # --------------------
     if GALLERY_HTML_FILE.exists():
-        original_gallery = GALLERY_HTML_FILE.read_text(encoding="utf-8")
-        GALLERY_HTML_BACKUP_FILE.write_text(original_gallery, encoding="utf-8")
-        print(f"Gallery backup created: {GALLERY_HTML_BACKUP_FILE}")
-
-        new_gallery = replace_section(
-            original_gallery,
-            *MARKERS_GALLERY["gallery_finished"],
-            gallery_finished_html,
+        gallery_changed = splice_sections(
+            GALLERY_HTML_FILE,
+            GALLERY_HTML_FILE,
+            MARKERS_GALLERY,
+            {"gallery_finished": gallery_finished_html},
+            backup_path=GALLERY_HTML_BACKUP_FILE,
         )
-        GALLERY_HTML_FILE.write_text(new_gallery, encoding="utf-8")
-        print(f"Updated gallery HTML written to: {GALLERY_HTML_FILE}")
+
+        if gallery_changed:
+            print(f"Gallery backup created: {GALLERY_HTML_BACKUP_FILE}")
+            print(f"Updated gallery HTML written to: {GALLERY_HTML_FILE}")
+        else:
+            print(f"Gallery HTML unchanged, skipping write: {GALLERY_HTML_FILE}")
     else:
         print(f"Warning: Gallery HTML file not found: {GALLERY_HTML_FILE}")
 
@@ -446,17 +788,19 @@ def main():
     # Update SKETCHBOOK page
     # --------------------
     if SKETCHBOOK_HTML_FILE.exists():
-        original_sketchbook = SKETCHBOOK_HTML_FILE.read_text(encoding="utf-8")
-        SKETCHBOOK_HTML_BACKUP_FILE.write_text(original_sketchbook, encoding="utf-8")
-        print(f"Sketchbook backup created: {SKETCHBOOK_HTML_BACKUP_FILE}")
-
-        new_sketchbook = replace_section(
-            original_sketchbook,
-            *MARKERS_SKETCHBOOK["gallery_sketchbook"],
-            gallery_sketchbook_html,
+        sketchbook_changed = splice_sections(
+            SKETCHBOOK_HTML_FILE,
+            SKETCHBOOK_HTML_FILE,
+            MARKERS_SKETCHBOOK,
+            {"gallery_sketchbook": gallery_sketchbook_html},
+            backup_path=SKETCHBOOK_HTML_BACKUP_FILE,
         )
-        SKETCHBOOK_HTML_FILE.write_text(new_sketchbook, encoding="utf-8")
-        print(f"Updated sketchbook HTML written to: {SKETCHBOOK_HTML_FILE}")
+
+        if sketchbook_changed:
+            print(f"Sketchbook backup created: {SKETCHBOOK_HTML_BACKUP_FILE}")
+            print(f"Updated sketchbook HTML written to: {SKETCHBOOK_HTML_FILE}")
+        else:
+            print(f"Sketchbook HTML unchanged, skipping write: {SKETCHBOOK_HTML_FILE}")
     else:
         print(f"Warning: Sketchbook HTML file not found: {SKETCHBOOK_HTML_FILE}")
 
@@ -8,26 +8,70 @@ to the NAS as sidecar .txt files.
 
 It NEVER overwrites existing non-empty .txt caption files.
 
+Generated captions are cached locally (.caption_cache/), keyed by the image
+content, and reused for identical or near-identical images (rescans, renames,
+re-copies). To get a NEW caption for an image, empty its .txt file: emptied
+captions always go back to OpenAI. Deleting the .txt instead reuses the
+cached caption; run with --refresh to skip the cache for every image.
+
 Run this BEFORE build_art_site.py, e.g.:
 
     python generate_captions.py
     python build_art_site.py
 """
 
+import argparse
+import asyncio
 import base64
+import functools
+import hashlib
+import io
 import json
 import os
+import pickle
+import threading
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 except ImportError:
     raise SystemExit(
         "The 'openai' package is not installed. "
         "Run: pip install openai"
     )
 
+# httpx ships with openai; it's used directly so every request shares one
+# pooled client. HTTP/2 (one multiplexed connection) needs the optional 'h2'
+# package: pip install "httpx[http2]"
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2  # noqa: F401
+    _HAVE_HTTP2 = True
+except ImportError:
+    _HAVE_HTTP2 = False
+
+# Pillow is optional: used to shrink + recompress images before upload.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# orjson is optional: a faster parser for the model's JSON replies.
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# imagehash is optional: used to reuse captions for near-duplicate scans.
+try:
+    import imagehash
+except ImportError:
+    imagehash = None
+
 
 # --------------------
 # CONFIGURATION
@@ -41,14 +85,59 @@ NAS_SKETCHBOOK_DIR = Path(r"\\192.168.2.132\art-site\sketchbook")
 # You can change this later if you prefer a different one.
 OPENAI_MODEL = "gpt-4o-mini"
 
+# When Pillow is installed, images are sent as a JPEG of at most this many px
+# on the longest side (the model downsizes internally anyway, so this only
+# shrinks the upload + image tokens)
+MAX_IMAGE_SIDE = 1024
+UPLOAD_JPEG_QUALITY = 85
+
+# Without Pillow the original file is streamed into the base64 data URL in
+# chunks this size (a multiple of 3 bytes, so each chunk encodes to base64
+# without padding and chunks can be concatenated)
+_B64_CHUNK_SIZE = 65536 * 3
+
+# Local cache of generated captions, keyed by a hash of the image bytes, so
+# re-runs and renamed/re-copied images never hit the API twice.
+REPO_ROOT = Path(__file__).resolve().parent
+CAPTION_CACHE_DIR = REPO_ROOT / ".caption_cache"
+
+# Perceptual hashes of captioned images ({phash_hex: [title, caption]}), so a
+# rescan / re-export of an already captioned piece reuses its caption. Two
+# images count as the same piece when their 64-bit pHashes differ in at most
+# PHASH_MAX_DISTANCE bits.
+PHASH_INDEX_FILE = CAPTION_CACHE_DIR / "phash.json"
+PHASH_MAX_DISTANCE = 4
+_PHASH_BITS = 64
+
+# Local index of NAS caption text (shared with build_art_site.py), validated by
+# the .txt (size, mtime), so unchanged captions aren't re-read over SMB
+NAS_INDEX_FILE = REPO_ROOT / ".nas_index.pkl"
+
 # Safety: limit how many images to caption per run so you don’t
 # accidentally blast through a huge backlog in one go.
 MAX_IMAGES_PER_RUN = 20
 
+# How many OpenAI requests to keep in flight at once (override with --workers)
+DEFAULT_WORKERS = 16
+
+# Connection pool shared by all OpenAI requests in a run
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE = 16
+HTTP_TIMEOUT = 60.0
+
 # --------------------
 # HELPER FUNCTIONS
 # --------------------
 
+_print_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+    """print() for worker threads, so concurrent lines never interleave."""
+    with _print_lock:
+        print(message, flush=True)
+
+
 def get_api_key() -> str:
     key = os.getenv("OPENAI_API_KEY")
     if not key:
@@ -60,47 +149,361 @@ def get_api_key() -> str:
     return key
 
 
-def encode_image_to_base64(path: Path) -> str:
+def make_http_client() -> "Optional[httpx.AsyncClient]":
+    """
+    Returns one pooled (HTTP/2 when available) httpx client for AsyncOpenAI,
+    or None to let the SDK use its default.
+    """
+    if httpx is None:
+        return None
+    return httpx.AsyncClient(
+        http2=_HAVE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=HTTP_TIMEOUT,
+    )
+
+
+def _stream_data_url(path: Path) -> Tuple[str, str]:
+    """
+    Streams the file once, hashing it and encoding it into a base64 data URL
+    chunk by chunk (so there's never a second full copy of the raw bytes).
+    Returns (digest, data URL); the digest matches hashing the whole file.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    ext = path.suffix.lstrip(".").lower()
+    buf = bytearray(f"data:image/{ext};base64,".encode("ascii"))
     with path.open("rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        while chunk := f.read(_B64_CHUNK_SIZE):
+            hasher.update(chunk)
+            buf += base64.b64encode(chunk)
+    return hasher.hexdigest(), buf.decode("ascii")
+
+
+def _decode_image(data: bytes, name: str) -> "Optional[Image.Image]":
+    """
+    Decodes image bytes that are already in memory, or returns None if Pillow
+    is missing or can't decode them.
+    """
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception as e:
+        log(f"[WARN] Could not decode {name}, sending original: {e}")
+        return None
+    return img
+
+
+def _flatten_to_rgb(img: "Image.Image") -> "Image.Image":
+    """
+    Converts an image to RGB for JPEG, compositing any transparency onto white.
+    (A plain convert("RGB") drops alpha, so ink on a transparent background
+    would come out as a solid black JPEG.)
+    """
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _thumbnail_file(digest: str) -> Path:
+    # thumb2_: older thumb_ files could have lost their transparency
+    return CAPTION_CACHE_DIR / f"thumb2_{digest}.jpg"
+
+
+def _upload_thumbnail(flat: "Image.Image", digest: str, name: str) -> Optional[bytes]:
+    """
+    Returns the flattened (RGB, see _flatten_to_rgb) image as a JPEG (longest
+    side <= MAX_IMAGE_SIDE), or None if it can't be re-encoded. 'flat' is
+    resized in place. The result is cached under _thumbnail_file(digest) so
+    reruns don't resize the original again.
+    """
+    try:
+        flat.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+        out = io.BytesIO()
+        flat.save(out, format="JPEG", quality=UPLOAD_JPEG_QUALITY)
+    except Exception as e:
+        log(f"[WARN] Could not resize {name}, sending original: {e}")
+        return None
+    data = out.getvalue()
+
+    # Best-effort cache: the thumbnail is still sent if it can't be stored
+    thumb_file = _thumbnail_file(digest)
+    tmp_file = thumb_file.with_name(f"{thumb_file.name}.{threading.get_ident()}.tmp")
+    try:
+        CAPTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, thumb_file)
+    except OSError as e:
+        log(f"[WARN] Could not cache thumbnail {thumb_file.name}: {e}")
+    return data
+
+
+def _is_degenerate_phash(phash: int) -> bool:
+    """
+    True for (nearly) all-0 / all-1 hashes, e.g. blank or single-colour frames:
+    unrelated images hash there too, so they must never count as duplicates.
+    """
+    ones = bin(phash).count("1")
+    return ones <= PHASH_MAX_DISTANCE or ones >= _PHASH_BITS - PHASH_MAX_DISTANCE
+
+
+def image_phash(flat: "Optional[Image.Image]", name: str) -> Optional[int]:
+    """
+    Returns the 64-bit perceptual hash of a flattened (RGB, see
+    _flatten_to_rgb) image, or None if imagehash is missing, there is no
+    image, or the hash is degenerate. (imagehash converts to greyscale, which
+    on the raw image would turn ink on transparency into an all-black frame.)
+    """
+    if imagehash is None or flat is None:
+        return None
+    try:
+        phash = int(str(imagehash.phash(flat)), 16)
+    except Exception as e:
+        log(f"[WARN] Could not hash {name} for near-duplicate lookup: {e}")
+        return None
+    return None if _is_degenerate_phash(phash) else phash
+
+
+def prepare_image(
+    path: Path,
+    use_cache: bool = True,
+) -> Tuple[str, Optional[Tuple[str, str]], Optional[int], Optional[str]]:
+    """
+    Reads the image from the NAS exactly once and derives everything
+    call_openai_caption() needs from those bytes:
+      (digest, cached (title, caption) or None, pHash or None, data URL or None)
+
+    The digest (hash of the original bytes) keys both the caption cache and
+    the upload thumbnails. On an exact cache hit (only looked up when
+    use_cache is set) nothing else is done;
+    otherwise the bytes are decoded once, in memory, flattened onto white,
+    and the pHash and the thumbnail both come from that one flattened image.
+    Without Pillow the original file is streamed into the data URL as is.
+    """
+    if Image is None:
+        digest, image_url = _stream_data_url(path)
+        cached = read_cached_caption(digest) if use_cache else None
+        if cached is not None:
+            return digest, cached, None, None
+        return digest, None, None, image_url
+
+    data = path.read_bytes()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    cached = read_cached_caption(digest) if use_cache else None
+    if cached is not None:
+        return digest, cached, None, None
+
+    try:
+        thumbnail = _thumbnail_file(digest).read_bytes()
+    except OSError:
+        thumbnail = None
+
+    img = None
+    if thumbnail is None or imagehash is not None:
+        img = _decode_image(data, path.name)
+    phash = None
+    if img is not None:
+        try:
+            flat = _flatten_to_rgb(img)
+        except Exception as e:
+            log(f"[WARN] Could not convert {path.name}, sending original: {e}")
+            flat = None
+        finally:
+            img.close()
+        if flat is not None:
+            phash = image_phash(flat, path.name)
+            if thumbnail is None:
+                thumbnail = _upload_thumbnail(flat, digest, path.name)
+            flat.close()
+
+    if thumbnail is not None:
+        image_url = "data:image/jpeg;base64," + base64.b64encode(thumbnail).decode("ascii")
+    else:
+        ext = path.suffix.lstrip(".").lower()
+        image_url = f"data:image/{ext};base64," + base64.b64encode(data).decode("ascii")
+    return digest, None, phash, image_url
+
+
+def read_cached_caption(digest: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns the cached (title, caption) for an image digest, or None on a miss.
+    """
+    cache_file = CAPTION_CACHE_DIR / f"{digest}.json"
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    title = str(data.get("title", "")).strip()
+    caption = str(data.get("caption", "")).strip()
+    if not title or not caption:
+        return None
+    return title, caption
+
+
+def write_cached_caption(digest: str, title: str, caption: str) -> None:
+    """
+    Stores (title, caption) for an image digest. Written to a temp file and
+    renamed into place so a crash never leaves a corrupt cache entry.
+    The cache is best-effort: a failed write is reported, not raised, so it
+    never costs the caption itself.
+    """
+    cache_file = CAPTION_CACHE_DIR / f"{digest}.json"
+    # Unique temp name per thread: two workers may cache identical images at once
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{threading.get_ident()}.tmp")
+    try:
+        CAPTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(
+            json.dumps({"title": title, "caption": caption}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        log(f"[WARN] Could not write caption cache {cache_file}: {e}")
 
 
-def list_images_without_captions(folder: Path) -> List[Path]:
+_phash_index: Optional[dict] = None
+_phash_index_dirty = False
+
+
+def _get_phash_index() -> dict:
+    """Returns { phash: (title, caption) }, loaded from PHASH_INDEX_FILE on first use."""
+    global _phash_index
+    if _phash_index is None:
+        _phash_index = {}
+        try:
+            data = json.loads(PHASH_INDEX_FILE.read_text(encoding="utf-8"))
+            for key, (title, caption) in data.items():
+                _phash_index[int(key, 16)] = (title, caption)
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+    return _phash_index
+
+
+def find_similar_caption(phash: int) -> Optional[Tuple[str, str]]:
     """
-    Returns a list of image files in 'folder' that do NOT have a non-empty .txt
-    caption file with the same stem.
+    Returns the (title, caption) of the closest previously captioned image
+    within PHASH_MAX_DISTANCE bits of 'phash', or None.
+    """
+    best = None
+    best_distance = PHASH_MAX_DISTANCE + 1
+    for known, result in _get_phash_index().items():
+        if _is_degenerate_phash(known):
+            # e.g. stored before transparent images were flattened for hashing
+            continue
+        distance = bin(known ^ phash).count("1")
+        if distance < best_distance:
+            best, best_distance = result, distance
+    return best
+
+
+def remember_phash(phash: int, title: str, caption: str) -> None:
+    global _phash_index_dirty
+    _get_phash_index()[phash] = (title, caption)
+    _phash_index_dirty = True
+
+
+def save_phash_index() -> None:
+    """Writes the pHash index back to disk if anything was added this run."""
+    if not _phash_index_dirty:
+        return
+    data = {f"{phash:016x}": list(result) for phash, result in _phash_index.items()}
+    CAPTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = PHASH_INDEX_FILE.with_name(PHASH_INDEX_FILE.name + ".tmp")
+    tmp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_file, PHASH_INDEX_FILE)
+
+
+def _load_nas_index() -> dict:
+    """Returns { folder: { stem: (size, mtime, caption) } }, or {} if missing/unreadable."""
+    try:
+        with open(NAS_INDEX_FILE, "rb") as f:
+            index = pickle.load(f)
+    except Exception:
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _save_nas_index(index: dict) -> None:
+    tmp_path = NAS_INDEX_FILE.with_name(NAS_INDEX_FILE.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, NAS_INDEX_FILE)
+
+
+def list_images_without_captions(folder: Path) -> List[Tuple[Path, bool]]:
+    """
+    Returns (image_path, emptied) for image files in 'folder' that do NOT have
+    a non-empty .txt caption file with the same stem. 'emptied' is True when
+    the .txt exists but is empty -- someone asking for a fresh caption.
+
+    The folder is listed once with os.scandir(); caption text comes from
+    NAS_INDEX_FILE when the .txt size + mtime are unchanged since the last run.
     """
     if not folder.exists():
         print(f"[WARN] Folder does not exist: {folder}")
         return []
 
     IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-    missing: List[Path] = []
 
-    for entry in folder.iterdir():
-        if not entry.is_file():
-            continue
-        if entry.suffix.lower() not in IMAGE_EXTS:
-            continue
+    with os.scandir(folder) as it:
+        entries = list(it)
+    # Case-folded, like exists() on Windows/SMB: Foo.TXT counts as Foo.jpg's caption
+    txt_entries = {e.name[:-4].lower(): e for e in entries if e.name.lower().endswith(".txt")}
 
-        caption_file = folder / (entry.stem + ".txt")
-        if caption_file.exists():
-            try:
-                text = caption_file.read_text(encoding="utf-8").strip()
-            except Exception:
-                text = ""
+    index = _load_nas_index()
+    folder_key = str(folder)
+    cached_rows = index.get(folder_key, {})
+    rows = {}
+
+    missing = []
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() not in IMAGE_EXTS or not entry.is_file():
+            continue
+        stem = stem.lower()
+
+        txt_entry = txt_entries.get(stem)
+        if txt_entry is not None:
+            st = txt_entry.stat()
+            row = cached_rows.get(stem)
+            if row is not None and row[:2] == (st.st_size, st.st_mtime):
+                text = row[2]
+                rows[stem] = row
+            else:
+                try:
+                    with open(txt_entry.path, encoding="utf-8") as f:
+                        text = f.read().strip()
+                    rows[stem] = (st.st_size, st.st_mtime, text)
+                except Exception:
+                    text = ""
             if text:
                 # Already has a caption, skip
                 continue
 
         # No caption file or empty caption
-        missing.append(entry)
+        missing.append((entry.stat().st_mtime, Path(entry.path), txt_entry is not None))
+
+    if rows != cached_rows:
+        index[folder_key] = rows
+        try:
+            _save_nas_index(index)
+        except OSError as e:
+            print(f"[WARN] Could not save NAS index {NAS_INDEX_FILE}: {e}")
 
     # Sort newest-first to caption recent uploads first
-    missing.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    return missing
+    missing.sort(key=lambda t: t[0], reverse=True)
+    return [(path, emptied) for _, path, emptied in missing]
 
 
+@functools.lru_cache(maxsize=None)
 def build_prompt(kind: str) -> str:
     """
     kind: "finished" or "sketchbook"
@@ -148,19 +551,39 @@ def build_prompt(kind: str) -> str:
 
 
 
-def call_openai_caption(
-    client: "OpenAI",
+async def call_openai_caption(
+    client: "AsyncOpenAI",
     image_path: Path,
-    kind: str
+    kind: str,
+    refresh: bool = False,
 ) -> Tuple[str, str]:
     """
     Sends the image to OpenAI and returns (title, caption).
+    Identical images (by content hash) are served from the local cache instead,
+    and near-identical ones (by perceptual hash) reuse the closest match,
+    unless 'refresh' is set (the fresh result then replaces the cached one).
+    File work (reading, hashing, thumbnails, cache) runs in a thread so it never
+    blocks the event loop while other requests are in flight.
     """
+    # One thread hop: one NAS read, then hash / cache check / decode in memory
+    digest, cached, phash, image_url = await asyncio.to_thread(
+        prepare_image, image_path, not refresh
+    )
+    if cached is not None:
+        log(f"[CACHE] {image_path.name} matches a previously captioned image")
+        return cached
+
+    if phash is not None and not refresh:
+        similar = find_similar_caption(phash)
+        if similar is not None:
+            log(f"[CACHE] {image_path.name} is a near-duplicate of a previously captioned image")
+            await asyncio.to_thread(write_cached_caption, digest, *similar)
+            return similar
+
     prompt = build_prompt(kind)
-    image_b64 = encode_image_to_base64(image_path)
 
     # Compose a chat completion with image + text instructions
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model=OPENAI_MODEL,
         messages=[
             {
@@ -170,7 +593,7 @@ def call_openai_caption(
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/{image_path.suffix.lstrip('.').lower()};base64,{image_b64}"
+                            "url": image_url
                         },
                     },
                 ],
@@ -182,13 +605,13 @@ def call_openai_caption(
     # We asked for JSON; parse it
     content = response.choices[0].message.content.strip()
     try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
+        data = json_loads(content)
+    except json.JSONDecodeError:  # orjson's JSONDecodeError subclasses this one
         # Fallback: try to extract JSON chunk if wrapped in text
         try:
             start = content.index("{")
             end = content.rindex("}") + 1
-            data = json.loads(content[start:end])
+            data = json_loads(content[start:end])
         except Exception:
             raise RuntimeError(f"Could not parse JSON from model response:\n{content}")
 
@@ -200,6 +623,9 @@ def call_openai_caption(
     if not caption:
         caption = f"{title} — illustration by Myles."
 
+    await asyncio.to_thread(write_cached_caption, digest, title, caption)
+    if phash is not None:
+        remember_phash(phash, title, caption)
     return title, caption
 
 
@@ -210,12 +636,45 @@ def write_caption_file(image_path: Path, title: str, caption: str) -> None:
     caption_file = image_path.with_suffix(".txt")
     combined = f"{title} — {caption}"
     caption_file.write_text(combined, encoding="utf-8")
-    print(f"[OK] Wrote caption: {caption_file.name}")
+    log(f"[OK] Wrote caption: {caption_file.name}")
 
 
-def process_folder(client: "OpenAI", folder: Path, kind: str, remaining_budget: int) -> int:
+async def _caption_one(
+    client: "AsyncOpenAI",
+    img_path: Path,
+    kind: str,
+    semaphore: asyncio.Semaphore,
+    refresh: bool = False,
+) -> bool:
+    """
+    Captions a single image and writes its .txt sidecar.
+    refresh: bypass the caption caches for this image.
+    Returns True on success; errors are reported, not raised.
     """
-    Captions up to 'remaining_budget' images in the given folder.
+    async with semaphore:
+        log(f"[CAPTION] {img_path.name} ({kind}) ...")
+        try:
+            title, caption = await call_openai_caption(client, img_path, kind, refresh)
+            await asyncio.to_thread(write_caption_file, img_path, title, caption)
+        except Exception as e:
+            log(f"[ERROR] Failed to caption {img_path.name}: {e}")
+            return False
+    return True
+
+
+async def process_folder(
+    client: "AsyncOpenAI",
+    folder: Path,
+    kind: str,
+    remaining_budget: int,
+    workers: int = DEFAULT_WORKERS,
+    refresh: bool = False,
+) -> int:
+    """
+    Captions up to 'remaining_budget' images in the given folder,
+    with up to 'workers' OpenAI requests in flight at once.
+    Images whose .txt was emptied (or all of them, with 'refresh') skip the
+    caption caches.
     Returns the remaining budget after processing.
     """
     if remaining_budget <= 0:
@@ -228,15 +687,22 @@ def process_folder(client: "OpenAI", folder: Path, kind: str, remaining_budget:
 
     print(f"[INFO] Found {len(missing)} unc captioned images in: {folder}")
 
+    # The budget is spent up front, so tasks never need to share a counter
     to_process = missing[:remaining_budget]
 
-    for img_path in to_process:
-        print(f"[CAPTION] {img_path.name} ({kind}) ...")
-        try:
-            title, caption = call_openai_caption(client, img_path, kind)
-            write_caption_file(img_path, title, caption)
-        except Exception as e:
-            print(f"[ERROR] Failed to caption {img_path.name}: {e}")
+    # One event loop holds every pending request; the semaphore caps how many
+    # are actually in flight.
+    semaphore = asyncio.Semaphore(max(1, workers))
+    results = await asyncio.gather(
+        *(
+            _caption_one(client, img_path, kind, semaphore, refresh or emptied)
+            for img_path, emptied in to_process
+        )
+    )
+    failed = results.count(False)
+
+    if failed:
+        print(f"[WARN] {failed} of {len(to_process)} images failed to caption in: {folder}")
 
     return remaining_budget - len(to_process)
 
@@ -245,23 +711,62 @@ def process_folder(client: "OpenAI", folder: Path, kind: str, remaining_budget:
 # MAIN
 # --------------------
 
-def main():
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate .txt captions for NAS artwork.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of concurrent OpenAI requests (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="ignore cached captions (exact and near-duplicate) and ask OpenAI again",
+    )
+    return parser.parse_args()
+
+
+async def async_main(args: argparse.Namespace) -> None:
     api_key = get_api_key()
-    client = OpenAI(api_key=api_key)
 
     budget = MAX_IMAGES_PER_RUN
     print(f"[START] Caption generation with budget: {budget} images")
 
-    # 1) Finished pieces
-    if budget > 0:
-        budget = process_folder(client, NAS_FINISHED_DIR, kind="finished", remaining_budget=budget)
+    async with AsyncOpenAI(api_key=api_key, http_client=make_http_client()) as client:
+        # 1) Finished pieces
+        if budget > 0:
+            budget = await process_folder(
+                client,
+                NAS_FINISHED_DIR,
+                kind="finished",
+                remaining_budget=budget,
+                workers=args.workers,
+                refresh=args.refresh,
+            )
+
+        # 2) Sketchbook
+        if budget > 0:
+            budget = await process_folder(
+                client,
+                NAS_SKETCHBOOK_DIR,
+                kind="sketchbook",
+                remaining_budget=budget,
+                workers=args.workers,
+                refresh=args.refresh,
+            )
 
-    # 2) Sketchbook
-    if budget > 0:
-        budget = process_folder(client, NAS_SKETCHBOOK_DIR, kind="sketchbook", remaining_budget=budget)
+    try:
+        save_phash_index()
+    except OSError as e:
+        print(f"[WARN] Could not save pHash index {PHASH_INDEX_FILE}: {e}")
 
     print(f"[DONE] Remaining caption budget after this run: {budget}")
 
 
+def main():
+    asyncio.run(async_main(parse_args()))
+
+
 if __name__ == "__main__":
     main()
@@ -17,33 +17,58 @@ Run this AFTER generate_captions.py and BEFORE build_art_site.py, e.g.:
     python build_art_site.py
 """
 
+import argparse
+import asyncio
+import functools
 import json
 import os
+import threading
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 except ImportError:
     raise SystemExit(
         "The 'openai' package is not installed. "
         "Run: pip install openai"
     )
+
+# httpx ships with openai; it's used directly so every request shares one
+# pooled client. HTTP/2 (one multiplexed connection) needs the optional 'h2'
+# package: pip install "httpx[http2]"
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2  # noqa: F401
+    _HAVE_HTTP2 = True
+except ImportError:
+    _HAVE_HTTP2 = False
+
+# orjson is optional: faster parsing of model replies and writing of sidecars.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # --------------------
 # SLUG HELPER
 # --------------------
 import re
 
+# Compiled once; a run of non-alphanumerics becomes a single hyphen, so no
+# separate "collapse multiple hyphens" pass is needed
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
 def make_slug(title: str) -> str:
     """
     Converts a title like 'Young Hellboy Illustration'
     into a clean slug: 'young-hellboy-illustration'.
     """
-    slug = title.lower()
-    slug = re.sub(r"[^a-z0-9]+", "-", slug)   # replace non-alphanumerics with hyphens
-    slug = re.sub(r"-{2,}", "-", slug)        # collapse multiple hyphens
-    slug = slug.strip("-")                    # trim leading/trailing hyphens
-    return slug
+    slug = _SLUG_RE.sub("-", title.lower())   # replace non-alphanumerics with hyphens
+    return slug.strip("-")                    # trim leading/trailing hyphens
 
 # --------------------
 # CONFIGURATION
@@ -59,6 +84,17 @@ TAG_MODEL = "gpt-4o-mini"
 # Safety: limit how many images to tag per run
 MAX_IMAGES_PER_RUN = 40  # can be higher/cheaper than captioning
 
+# How many captions to tag per API request (one request per batch)
+TAG_BATCH_SIZE = 10
+
+# How many OpenAI requests (batches) to keep in flight at once (override with --workers)
+DEFAULT_WORKERS = 16
+
+# Connection pool shared by all OpenAI requests in a run
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE = 16
+HTTP_TIMEOUT = 60.0
+
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
 
 
@@ -66,6 +102,15 @@ IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
 # HELPER FUNCTIONS
 # --------------------
 
+_print_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+    """print() for worker threads, so concurrent lines never interleave."""
+    with _print_lock:
+        print(message, flush=True)
+
+
 def get_api_key() -> str:
     key = os.getenv("OPENAI_API_KEY")
     if not key:
@@ -77,9 +122,26 @@ def get_api_key() -> str:
     return key
 
 
-def list_captioned_images_without_json(folder: Path) -> List[Path]:
+def make_http_client() -> "Optional[httpx.AsyncClient]":
+    """
+    Returns one pooled (HTTP/2 when available) httpx client for AsyncOpenAI,
+    or None to let the SDK use its default.
     """
-    Returns a list of image files in 'folder' that:
+    if httpx is None:
+        return None
+    return httpx.AsyncClient(
+        http2=_HAVE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=HTTP_TIMEOUT,
+    )
+
+
+def list_captioned_images_without_json(folder: Path) -> List[Tuple[Path, Path]]:
+    """
+    Returns a list of (image_path, caption_path) for image files in 'folder' that:
       - have a non-empty .txt caption sidecar
       - do NOT yet have a .json metadata sidecar
     """
@@ -87,36 +149,44 @@ def list_captioned_images_without_json(folder: Path) -> List[Path]:
         print(f"[WARN] Folder does not exist: {folder}")
         return []
 
-    result: List[Path] = []
+    # One directory listing; caption/JSON existence is then a local set lookup.
+    # Names are case-folded, like exists() on Windows/SMB, so e.g. Foo.JSON
+    # still counts (and is never overwritten by a new foo.json).
+    with os.scandir(folder) as it:
+        entries = list(it)
+    txt_entries = {e.name[:-4].lower(): e for e in entries if e.name.lower().endswith(".txt")}
+    json_stems = {e.name[:-5].lower() for e in entries if e.name.lower().endswith(".json")}
 
-    for entry in folder.iterdir():
-        if not entry.is_file():
-            continue
-        if entry.suffix.lower() not in IMAGE_EXTS:
+    result: List[Tuple[float, Path, Path]] = []
+
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() not in IMAGE_EXTS or not entry.is_file():
             continue
+        stem = stem.lower()
 
-        caption_file = entry.with_suffix(".txt")
-        json_file = entry.with_suffix(".json")
+        # Skip if JSON already exists
+        if stem in json_stems:
+            continue
 
         # Require a non-empty caption file
-        if not caption_file.exists():
+        txt_entry = txt_entries.get(stem)
+        if txt_entry is None:
             continue
         try:
-            caption_text = caption_file.read_text(encoding="utf-8").strip()
+            with open(txt_entry.path, encoding="utf-8") as f:
+                caption_text = f.read().strip()
         except Exception:
             caption_text = ""
         if not caption_text:
             continue
 
-        # Skip if JSON already exists
-        if json_file.exists():
-            continue
-
-        result.append(entry)
+        # DirEntry.stat() is cached (from the directory listing on Windows/SMB)
+        result.append((entry.stat().st_mtime, Path(entry.path), Path(txt_entry.path)))
 
     # Newest-first (same idea as captioning)
-    result.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    return result
+    result.sort(key=lambda t: t[0], reverse=True)
+    return [(img_path, caption_path) for _, img_path, caption_path in result]
 
 
 def parse_caption_file(caption_path: Path) -> Tuple[str, str]:
@@ -129,10 +199,10 @@ def parse_caption_file(caption_path: Path) -> Tuple[str, str]:
       caption = full text
     """
     raw = caption_path.read_text(encoding="utf-8").strip()
-    separator = " — "  # space + em dash + space
+    # One scan: sep is empty when there's no " — " (space + em dash + space)
+    title_part, sep, caption_part = raw.partition(" — ")
 
-    if separator in raw:
-        title_part, caption_part = raw.split(separator, 1)
+    if sep:
         title = title_part.strip()
         caption = caption_part.strip()
     else:
@@ -148,23 +218,73 @@ def parse_caption_file(caption_path: Path) -> Tuple[str, str]:
     return title, caption
 
 
-def call_openai_tags_and_characters(
-    client: "OpenAI",
-    title: str,
-    caption: str,
-    kind: str,
-    max_tags: int = 10,
-) -> Tuple[list, list]:
+def _parse_json_response(content: str) -> dict:
     """
-    Text-only call: generate tags + character names from existing title + caption.
-    kind: 'finished' or 'sketchbook' (for flavour only)
+    Parses the model's JSON reply, tolerating text wrapped around the JSON object.
+    """
+    json_loads = orjson.loads if orjson is not None else json.loads
+    try:
+        return json_loads(content)
+    except json.JSONDecodeError:  # orjson's JSONDecodeError subclasses this one
+        # Fallback: try to pull out JSON chunk
+        try:
+            start = content.index("{")
+            end = content.rindex("}") + 1
+            return json_loads(content[start:end])
+        except Exception:
+            raise RuntimeError(f"Could not parse JSON from model response:\n{content}")
 
-    Returns:
-      (tags, characters)
 
-    'characters' should only include clearly named characters like:
-      ["Batman", "Deadpool", "Spider-Man", "Leonardo", ...]
-    or be an empty list [] if none are confidently identified.
+def _clean_tags_and_characters(data: dict, max_tags: int) -> Tuple[list, list]:
+    """
+    Validates + cleans one {"tags": [...], "characters": [...]} result.
+    Raises RuntimeError if 'tags' is not a list.
+    """
+    raw_tags = data.get("tags", [])
+    raw_chars = data.get("characters", [])
+
+    if not isinstance(raw_tags, list):
+        raise RuntimeError(f"Model returned invalid 'tags' field:\n{data}")
+    if not isinstance(raw_chars, list):
+        # Normalise to list if model replied incorrectly
+        raw_chars = []
+
+    # Clean + dedupe tags
+    cleaned_tags = []
+    seen_tags = set()
+    for t in raw_tags:
+        if not isinstance(t, str):
+            continue
+        tag = t.strip()
+        if not tag:
+            continue
+        low = tag.lower()
+        if low not in seen_tags:
+            seen_tags.add(low)
+            cleaned_tags.append(tag)
+
+    # Clean + dedupe characters (preserve case)
+    cleaned_chars = []
+    seen_chars = set()
+    for c in raw_chars:
+        if not isinstance(c, str):
+            continue
+        name = c.strip()
+        if not name:
+            continue
+        if name.lower() not in seen_chars:
+            seen_chars.add(name.lower())
+            cleaned_chars.append(name)
+
+    return cleaned_tags[:max_tags], cleaned_chars
+
+
+@functools.lru_cache(maxsize=None)
+def build_prompt(kind: str, max_tags: int) -> str:
+    """
+    kind: "finished" or "sketchbook"
+    Returns the instructions shared by every tagging request (everything
+    before the per-image INPUTS).
     """
     role = (
         "You are tagging a young artist's FINISHED comic and pop-culture artwork "
@@ -175,19 +295,14 @@ def call_openai_tags_and_characters(
         "comic and pop-culture artwork for an online portfolio."
     )
 
-    prompt = f"""
+    return f"""
 {role}
 
-You are given the TITLE and CAPTION that already describe a piece of artwork.
-
-Do NOT change the title or caption. Your job is ONLY to create useful tags
-and extract clearly named characters.
-
-TITLE:
-\"\"\"{title}\"\"\"
+You are given a list of INPUTS. Each input has an "id" plus the TITLE and
+CAPTION that already describe one piece of artwork.
 
-CAPTION:
-\"\"\"{caption}\"\"\"
+Do NOT change the titles or captions. Your job is ONLY to create useful tags
+and extract clearly named characters for EACH input, independently.
 
 RULES FOR TAGS:
 - Generate 5 to {max_tags} tags.
@@ -212,23 +327,63 @@ RULES FOR CHARACTERS:
 - If an alias and real name both appear, choose the better-known name (e.g. "Spider-Man" instead of "Peter Parker").
 - If NO clear named characters appear, return an empty list: [].
 
-Respond in STRICT JSON with exactly two keys: "tags" and "characters".
+Respond in STRICT JSON with exactly one key, "results": a list with one
+object per input, each with exactly three keys: "id", "tags" and "characters".
 
 Example format:
 {{
-  "tags": [
-    "comic art",
-    "dynamic pose",
-    "inked line art",
-    "batman"
-  ],
-  "characters": [
-    "Batman"
+  "results": [
+    {{
+      "id": 0,
+      "tags": [
+        "comic art",
+        "dynamic pose",
+        "inked line art",
+        "batman"
+      ],
+      "characters": [
+        "Batman"
+      ]
+    }}
   ]
 }}
 """
 
-    response = client.chat.completions.create(
+
+async def call_openai_tags_and_characters(
+    client: "AsyncOpenAI",
+    items: List[Tuple[str, str]],
+    kind: str,
+    max_tags: int = 10,
+) -> List[Optional[Tuple[list, list]]]:
+    """
+    Text-only call: generate tags + character names for a batch of artworks
+    from their existing (title, caption) pairs, in a single request.
+    kind: 'finished' or 'sketchbook' (for flavour only)
+
+    Returns one entry per input item, in order:
+      (tags, characters), or None if the model's result for that item
+      was missing or invalid (the caller can retry it on its own).
+
+    'characters' should only include clearly named characters like:
+      ["Batman", "Deadpool", "Spider-Man", "Leonardo", ...]
+    or be an empty list [] if none are confidently identified.
+    """
+    inputs = [
+        {"id": i, "title": title, "caption": caption}
+        for i, (title, caption) in enumerate(items)
+    ]
+
+    # The instructions come first and the per-image data last, so the shared
+    # prefix is identical across requests.
+    prompt = (
+        build_prompt(kind, max_tags)
+        + "\nINPUTS:\n"
+        + json.dumps(inputs, ensure_ascii=False, indent=2)
+        + "\n"
+    )
+
+    response = await client.chat.completions.create(
         model=TAG_MODEL,
         messages=[
             {
@@ -240,55 +395,25 @@ Example format:
     )
 
     content = response.choices[0].message.content.strip()
+    data = _parse_json_response(content)
 
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        # Fallback: try to pull out JSON chunk
-        try:
-            start = content.index("{")
-            end = content.rindex("}") + 1
-            data = json.loads(content[start:end])
-        except Exception:
-            raise RuntimeError(f"Could not parse JSON from model response:\n{content}")
+    raw_results = data.get("results", [])
+    if not isinstance(raw_results, list):
+        raise RuntimeError(f"Model returned invalid 'results' field:\n{data}")
 
-    raw_tags = data.get("tags", [])
-    raw_chars = data.get("characters", [])
-
-    if not isinstance(raw_tags, list):
-        raise RuntimeError(f"Model returned invalid 'tags' field:\n{data}")
-    if not isinstance(raw_chars, list):
-        # Normalise to list if model replied incorrectly
-        raw_chars = []
-
-    # Clean + dedupe tags
-    cleaned_tags = []
-    seen_tags = set()
-    for t in raw_tags:
-        if not isinstance(t, str):
-            continue
-        tag = t.strip()
-        if not tag:
-            continue
-        low = tag.lower()
-        if low not in seen_tags:
-            seen_tags.add(low)
-            cleaned_tags.append(tag)
-
-    # Clean + dedupe characters (preserve case)
-    cleaned_chars = []
-    seen_chars = set()
-    for c in raw_chars:
-        if not isinstance(c, str):
-            continue
-        name = c.strip()
-        if not name:
-            continue
-        if name.lower() not in seen_chars:
-            seen_chars.add(name.lower())
-            cleaned_chars.append(name)
+    by_id = {}
+    for result in raw_results:
+        if isinstance(result, dict) and isinstance(result.get("id"), int):
+            by_id.setdefault(result["id"], result)
 
-    return cleaned_tags[:max_tags], cleaned_chars
+    cleaned: List[Optional[Tuple[list, list]]] = []
+    for i in range(len(items)):
+        result = by_id.get(i)
+        try:
+            cleaned.append(_clean_tags_and_characters(result, max_tags) if result else None)
+        except RuntimeError:
+            cleaned.append(None)
+    return cleaned
 
 
 def write_json_sidecar(
@@ -320,22 +445,80 @@ def write_json_sidecar(
         "slug": slug,
     }
 
-    json_path.write_text(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
-    print(f"[OK] Wrote metadata: {json_path.name}")
+    if orjson is not None:
+        # Same layout as json.dumps(indent=2), already UTF-8 bytes
+        json_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        json_path.write_text(
+            json.dumps(data, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+    log(f"[OK] Wrote metadata: {json_path.name}")
 
 
-def process_folder(
-    client: "OpenAI",
+async def _tag_batch(
+    client: "AsyncOpenAI",
+    batch: List[Tuple[Path, str, str]],
+    kind: str,
+    semaphore: asyncio.Semaphore,
+) -> None:
+    """
+    Tags one batch of (image_path, title, caption) with a single request and
+    writes the JSON sidecars. Images without a valid result are retried alone.
+    Errors are reported per image, not raised.
+    """
+    async with semaphore:
+        log(f"[TAGS] {len(batch)} images ({kind}): {', '.join(p.name for p, _, _ in batch)} ...")
+        try:
+            results = await call_openai_tags_and_characters(
+                client,
+                [(title, caption) for _, title, caption in batch],
+                kind=kind,
+                max_tags=10,
+            )
+        except Exception as e:
+            log(f"[WARN] Batch tag request failed, retrying images one by one: {e}")
+            results = [None] * len(batch)
+
+        for (img_path, title, caption), result in zip(batch, results):
+            try:
+                if result is None:
+                    # Retry this image on its own to keep one bad result from losing it
+                    log(f"[TAGS] {img_path.name} ({kind}) ...")
+                    retry = await call_openai_tags_and_characters(
+                        client,
+                        [(title, caption)],
+                        kind=kind,
+                        max_tags=10,
+                    )
+                    result = retry[0]
+                    if result is None:
+                        raise RuntimeError("Model returned no valid result for this image")
+                tags, characters = result
+                await asyncio.to_thread(
+                    write_json_sidecar,
+                    image_path=img_path,
+                    title=title,
+                    caption=caption,
+                    tags=tags,
+                    characters=characters,
+                    kind=kind,
+                )
+            except Exception as e:
+                log(f"[ERROR] Failed to generate tags for {img_path.name}: {e}")
+
+
+async def process_folder(
+    client: "AsyncOpenAI",
     folder: Path,
     kind: str,
     remaining_budget: int,
+    workers: int = DEFAULT_WORKERS,
 ) -> int:
     """
     Creates JSON sidecars for up to 'remaining_budget' images
-    in 'folder' that already have .txt captions but no .json.
+    in 'folder' that already have .txt captions but no .json,
+    with up to 'workers' batch requests in flight at once.
     Returns updated remaining_budget.
     """
     if remaining_budget <= 0:
@@ -348,30 +531,28 @@ def process_folder(
 
     print(f"[INFO] Found {len(candidates)} images needing JSON in: {folder}")
 
+    # The budget is spent up front, so tasks never need to share a counter
     to_process = candidates[:remaining_budget]
 
-    for img_path in to_process:
-        caption_path = img_path.with_suffix(".txt")
-        print(f"[TAGS] {img_path.name} ({kind}) ...")
+    # Parse every caption up front (cheap local-ish reads), then tag in batches
+    parsed: List[Tuple[Path, str, str]] = []
+    for img_path, caption_path in to_process:
         try:
             title, caption = parse_caption_file(caption_path)
-            tags, characters = call_openai_tags_and_characters(
-                client,
-                title,
-                caption,
-                kind=kind,
-                max_tags=10,
-            )
-            write_json_sidecar(
-                image_path=img_path,
-                title=title,
-                caption=caption,
-                tags=tags,
-                characters=characters,
-                kind=kind,
-            )
         except Exception as e:
-            print(f"[ERROR] Failed to generate tags for {img_path.name}: {e}")
+            print(f"[ERROR] Failed to read caption for {img_path.name}: {e}")
+            continue
+        parsed.append((img_path, title, caption))
+
+    batches = [
+        parsed[start:start + TAG_BATCH_SIZE]
+        for start in range(0, len(parsed), TAG_BATCH_SIZE)
+    ]
+
+    # One event loop holds every pending batch; the semaphore caps how many
+    # requests are actually in flight.
+    semaphore = asyncio.Semaphore(max(1, workers))
+    await asyncio.gather(*(_tag_batch(client, batch, kind, semaphore) for batch in batches))
 
     return remaining_budget - len(to_process)
 
@@ -380,33 +561,50 @@ def process_folder(
 # MAIN
 # --------------------
 
-def main():
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate .json tag metadata from NAS captions.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of concurrent OpenAI requests (default: {DEFAULT_WORKERS})",
+    )
+    return parser.parse_args()
+
+
+async def async_main(args: argparse.Namespace) -> None:
     api_key = get_api_key()
-    client = OpenAI(api_key=api_key)
 
     budget = MAX_IMAGES_PER_RUN
     print(f"[START] Tag + character generation with budget: {budget} images")
 
-    # 1) Finished pieces
-    if budget > 0:
-        budget = process_folder(
-            client,
-            NAS_FINISHED_DIR,
-            kind="finished",
-            remaining_budget=budget,
-        )
+    async with AsyncOpenAI(api_key=api_key, http_client=make_http_client()) as client:
+        # 1) Finished pieces
+        if budget > 0:
+            budget = await process_folder(
+                client,
+                NAS_FINISHED_DIR,
+                kind="finished",
+                remaining_budget=budget,
+                workers=args.workers,
+            )
 
-    # 2) Sketchbook
-    if budget > 0:
-        budget = process_folder(
-            client,
-            NAS_SKETCHBOOK_DIR,
-            kind="sketchbook",
-            remaining_budget=budget,
-        )
+        # 2) Sketchbook
+        if budget > 0:
+            budget = await process_folder(
+                client,
+                NAS_SKETCHBOOK_DIR,
+                kind="sketchbook",
+                remaining_budget=budget,
+                workers=args.workers,
+            )
 
     print(f"[DONE] Remaining tag budget after this run: {budget}")
 
 
+def main():
+    asyncio.run(async_main(parse_args()))
+
+
 if __name__ == "__main__":
     main()